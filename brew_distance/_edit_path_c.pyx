@@ -0,0 +1,92 @@
+# cython: language_level=3, boundscheck=False, wraparound=False
+
+"""Compiled kernel for the distance-only case of brew_distance."""
+
+# Copyright (C) 2017, 2018 David H. Gutteridge.
+# This program is free software; you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation; either version 2 of the License, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin St, Fifth Floor, Boston, MA 02110-1301 USA.
+
+from libc.stdlib cimport free, malloc
+
+
+cpdef long long edit_distance_c(
+    const unsigned int[::1] codes1,
+    const unsigned int[::1] codes2,
+    long long match_cost,
+    long long ins_cost,
+    long long del_cost,
+    long long subst_cost,
+    long long initial_cost,
+    double max_distance,
+) except? -1:
+    """Two-row equivalent of brew_distance._edit_distance_python, over integer costs.
+
+    codes1 and codes2 are the code points of the two strings, e.g. a
+    memoryview of their UTF-32 encoding cast to "I". max_distance is a
+    float, infinite if there is no limit; the search stops early as it
+    does in the pure-Python loop.
+    """
+    cdef Py_ssize_t len1 = codes1.shape[0]
+    cdef Py_ssize_t len2 = codes2.shape[0]
+    cdef Py_ssize_t i, j
+    cdef long long best_cost, cost_with_ins, cost_with_del, row_min
+    cdef long long result = 0
+    cdef bint stopped = False
+    cdef long long *prev
+    cdef long long *curr
+    cdef long long *swap
+
+    prev = <long long *> malloc((len2 + 1) * sizeof(long long))
+    curr = <long long *> malloc((len2 + 1) * sizeof(long long))
+    if prev == NULL or curr == NULL:
+        free(prev)
+        free(curr)
+        raise MemoryError()
+
+    with nogil:
+        prev[0] = initial_cost
+        for j in range(len2):
+            prev[j + 1] = prev[j] + ins_cost
+
+        for i in range(len1):
+            curr[0] = prev[0] + del_cost
+            row_min = curr[0]
+            for j in range(len2):
+                if codes1[i] == codes2[j]:
+                    best_cost = prev[j] + match_cost
+                else:
+                    best_cost = prev[j] + subst_cost
+                cost_with_ins = curr[j] + ins_cost
+                if cost_with_ins < best_cost:
+                    best_cost = cost_with_ins
+                cost_with_del = prev[j + 1] + del_cost
+                if cost_with_del < best_cost:
+                    best_cost = cost_with_del
+                curr[j + 1] = best_cost
+                if best_cost < row_min:
+                    row_min = best_cost
+            if row_min > max_distance:
+                result = row_min
+                stopped = True
+                break
+            swap = prev
+            prev = curr
+            curr = swap
+
+        if not stopped:
+            result = prev[len2]
+
+    free(prev)
+    free(curr)
+    return result
@@ -0,0 +1,136 @@
+"""Numba-compiled kernels for brew_distance.
+
+Numba is slow to import, so this module is only imported by
+brew_distance._load_numba, the first time a comparison is big enough to
+warrant it.
+"""
+
+# Copyright (C) 2017, 2018 David H. Gutteridge.
+# This program is free software; you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation; either version 2 of the License, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin St, Fifth Floor, Boston, MA 02110-1301 USA.
+
+import numba
+import numpy as np
+
+from .brew_distance import _DEL, _INITIAL, _INS, _MATCH, _SUBST, _TIED
+
+
+@numba.njit(cache=True)
+def edit_path_nb(codes1, codes2, costs):
+    """Compiled equivalent of the _edit_path loop, over integer costs.
+
+    Returns the distance and the move table, encoded as for the
+    pure-Python loop. (Numba treats the module's integer globals as
+    constants.)
+    """
+    (match_cost, ins_cost, del_cost, subst_cost, initial_cost) = costs
+    len1 = codes1.shape[0]
+    len2 = codes2.shape[0]
+    prev = np.empty(len2 + 1, dtype=np.int64)
+    curr = np.empty(len2 + 1, dtype=np.int64)
+    moves = np.empty((len1 + 1, len2 + 1), dtype=np.uint8)
+    moves[0, 0] = _INITIAL
+
+    # Insertions
+    prev[0] = initial_cost
+    for j in range(len2):
+        prev[j + 1] = prev[j] + ins_cost
+        moves[0, j + 1] = _INS
+
+    # Deletions and substitutions
+    for i in range(len1):
+        curr[0] = prev[0] + del_cost
+        moves[i + 1, 0] = _DEL
+        for j in range(len2):
+            if codes1[i] == codes2[j]:
+                subst = match_cost
+            else:
+                subst = subst_cost
+
+            so_far = prev[j]
+            best_cost = so_far + subst
+            move = _SUBST if subst else _MATCH
+
+            cost_with_ins = curr[j] + ins_cost
+            if cost_with_ins < best_cost:
+                so_far = curr[j]
+                best_cost = cost_with_ins
+                move = _INS
+
+            cost_with_del = prev[j + 1] + del_cost
+            if cost_with_del < best_cost:
+                so_far = prev[j + 1]
+                best_cost = cost_with_del
+                move = _DEL
+
+            if best_cost == so_far:
+                move |= _TIED
+
+            curr[j + 1] = best_cost
+            moves[i + 1, j + 1] = move
+        (prev, curr) = (curr, prev)
+
+    return (prev[len2], moves)
+
+@numba.njit(cache=True)
+def edit_distance_nb(codes1, codes2, costs, max_distance):
+    """Compiled equivalent of the _edit_distance_only loop, over integer costs.
+
+    max_distance is a float, infinite if there is no limit.
+    Stops early as _edit_distance_python does.
+    """
+    (match_cost, ins_cost, del_cost, subst_cost, initial_cost) = costs
+    len2 = codes2.shape[0]
+    prev = np.empty(len2 + 1, dtype=np.int64)
+    curr = np.empty(len2 + 1, dtype=np.int64)
+    prev[0] = initial_cost
+    for j in range(len2):
+        prev[j + 1] = prev[j] + ins_cost
+
+    for i in range(codes1.shape[0]):
+        curr[0] = prev[0] + del_cost
+        row_min = curr[0]
+        for j in range(len2):
+            if codes1[i] == codes2[j]:
+                best_cost = prev[j] + match_cost
+            else:
+                best_cost = prev[j] + subst_cost
+            cost_with_ins = curr[j] + ins_cost
+            if cost_with_ins < best_cost:
+                best_cost = cost_with_ins
+            cost_with_del = prev[j + 1] + del_cost
+            if cost_with_del < best_cost:
+                best_cost = cost_with_del
+            curr[j + 1] = best_cost
+            if best_cost < row_min:
+                row_min = best_cost
+        if row_min > max_distance:
+            return row_min
+        (prev, curr) = (curr, prev)
+
+    return prev[len2]
+
+@numba.njit(cache=True, parallel=True)
+def distances_one_to_many_nb(query, codes, offsets, costs, max_distance):
+    """Run edit_distance_nb from query to each candidate, in parallel.
+
+    The candidates' code points are concatenated in codes, with
+    candidate k at codes[offsets[k]:offsets[k + 1]].
+    """
+    results = np.empty(offsets.shape[0] - 1, dtype=np.int64)
+    for k in numba.prange(results.shape[0]):
+        results[k] = edit_distance_nb(
+            query, codes[offsets[k] : offsets[k + 1]], costs, max_distance
+        )
+    return results
@@ -17,19 +17,30 @@
 # with this program; if not, write to the Free Software Foundation, Inc.,
 # 51 Franklin St, Fifth Floor, Boston, MA 02110-1301 USA.
 
-from collections import namedtuple
+import functools
+import math
 import numbers
 import sys
 
 # Public symbols
-__all__ = ("distance", "BrewDistanceException")
+__all__ = ("distance", "distances_one_to_many", "BrewDistanceException")
 __author__ = "David H. Gutteridge and Chris Brew"
 __version__ = "1.0.2"
 
 from dataclasses import dataclass
 
 from enum import Enum
-from typing import List, Optional, NamedTuple, Union, Tuple
+from typing import List, Sequence, Union, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    from ._edit_path_c import edit_distance_c
+except ImportError:
+    edit_distance_c = None
 
 
 class BrewDistanceException(Exception):
@@ -46,100 +57,696 @@ class Move(Enum):
     INITIAL = 4
 
 
-class Traceback(NamedTuple):
-    cost: int
-    move: Move
-    traceback: Optional["Traceback"]
+# Internally, moves are handled as their ordinals, since comparing and
+# looking up Enum members is slow; they're only converted to Move by
+# _list_edits.
+_MATCH = Move.MATCH.value
+_INS = Move.INS.value
+_DEL = Move.DEL.value
+_SUBST = Move.SUBST.value
+_INITIAL = Move.INITIAL.value
+
+# Move tables store the ordinal of the move taken into each cell. When the
+# move is reported as a MATCH because it didn't change the cost, _TIED is
+# or'ed in, so the low two bits still identify the predecessor cell.
+_TIED = 4
+
+# Moves indexed by ordinal.
+_MOVES = tuple(Move)
+
+# Below this many cells in the table, the pure-Python loops beat calling
+# the Numba kernels.
+_NUMBA_MIN_CELLS = 64
+
+# Importing Numba and loading the compiled kernels takes around half a
+# second per process, about what the other loops take over this many cells,
+# so the kernels are only loaded for a table at least this big.
+_NUMBA_LOAD_MIN_CELLS = 1_000_000
+
+# Below this many characters in the second string, the per-row overhead of
+# the NumPy kernels outweighs their savings over the pure-Python loops. The
+# edits kernel does more work per row, so it takes longer to pay off.
+_NUMPY_EDITS_MIN_LENGTH = 128
+_NUMPY_DISTANCE_MIN_LENGTH = 64
+
+# Below this many characters in the shorter string, each compiled kernel
+# beats the bit-parallel one for unit costs.
+_MYERS_MIN_LENGTH_C = 1024
+_MYERS_MIN_LENGTH_NUMBA = 512
+
+# Likewise for the anti-diagonal NumPy kernel against the pure-Python loop,
+# for the shorter string, with float costs. Mixing int and float costs
+# makes the kernel track the types of its cells as well, and lets the
+# pure-Python loop keep some cells as ints, so it pays off much later.
+_DIAGONAL_MIN_LENGTH = 128
+_DIAGONAL_MIXED_MIN_LENGTH = 320
+
+
+def _edit_path(string1, string2, cost) -> Tuple[numbers.Real, Sequence[int], int, int, int]:
+    """Determine the transformations required to make the first string the same as the second.
+
+    Provides the distance, the flat move table to walk for the edits, the
+    lengths of the two strings it covers, and the length of the common
+    suffix matched after them.
+    """
+    # The Move keys are slow to hash, so the costs are looked up just once.
+    costs = tuple(cost[m] for m in _MOVES)
+    (match_cost, ins_cost, del_cost, subst_cost, initial_cost) = costs
+
+    # A common suffix is bound to be matched when matches are free, and the
+    # rest of the path is the same without it. (A common prefix isn't: ties
+    # can be broken differently once it's removed.)
+    suffix = _common_suffix(string1, string2) if _free_matches(costs) else 0
+    if suffix:
+        (string1, string2) = (string1[:-suffix], string2[:-suffix])
+    len1 = len(string1)
+    len2 = len(string2)
 
+    big = len1 * len2 >= _NUMBA_MIN_CELLS
+    if (
+        np is not None
+        and (big or len2 >= _NUMPY_EDITS_MIN_LENGTH)
+        and _native_costs(costs, len1 + len2)
+    ):
+        if big and _load_numba(len1 * len2) is not None:
+            return _edit_path_numba(string1, string2, costs) + (suffix,)
+        if len2 >= _NUMPY_EDITS_MIN_LENGTH:
+            return _edit_path_numpy(string1, string2, costs) + (suffix,)
 
-def _best(sub_move: Traceback, ins_move: Traceback, del_move: Traceback):
-    """Determine the optimum edit."""
+    # Only two rows of costs are kept; the move table is flat, row-major,
+    # with len2 + 1 cells per row.
+    moves = bytearray((len1 + 1) * (len2 + 1))
+    moves[0] = _INITIAL
 
-    (increment, move1, traceback1) = sub_move
-    cost_with_sub = increment + traceback1.cost
+    # Locals are quicker to look up than globals.
+    (match_move, ins_move, del_move, subst_move) = (_MATCH, _INS, _DEL, _SUBST)
 
-    (increment, move2, traceback2) = ins_move
-    cost_with_ins = increment + traceback2.cost
+    # Insertions
+    prev = [initial_cost]
+    for j in range(0, len2):
+        prev.append(prev[j] + ins_cost)
+        moves[j + 1] = ins_move
+
+    # Deletions and substitutions. The diagonal, left and upper neighbours
+    # are carried along the row in locals.
+    index = len2
+    for char1 in string1:
+        index += 1
+        diag = prev[0]
+        left = diag + del_cost
+        curr = [left]
+        moves[index] = del_move
+        for (char2, up) in zip(string2, prev[1:]):
+            index += 1
+            if char1 == char2:
+                subst = match_cost
+            else:
+                subst = subst_cost
+
+            so_far = diag
+            best_cost = diag + subst
+            move = subst_move if subst else match_move
 
-    (increment, move3, traceback3) = del_move
-    cost_with_del = increment + traceback3.cost
+            if left + ins_cost < best_cost:
+                so_far = left
+                best_cost = left + ins_cost
+                move = ins_move
 
-    best_cost = cost_with_sub
-    move = move1
-    traceback = traceback1
+            if up + del_cost < best_cost:
+                so_far = up
+                best_cost = up + del_cost
+                move = del_move
 
-    if cost_with_ins < best_cost:
-        best_cost = cost_with_ins
-        move = move2
-        traceback = traceback2
+            # This is predicated on match having a lower cost than other
+            # operations, and so doesn't necessarily work if that doesn't hold.
+            if best_cost == so_far:
+                move |= _TIED
 
-    if cost_with_del < best_cost:
-        best_cost = cost_with_del
-        move = move3
-        traceback = traceback3
+            curr.append(best_cost)
+            moves[index] = move
+            diag = up
+            left = best_cost
+        prev = curr
 
-    # This is predicated on match having a lower cost than other
-    # operations, and so doesn't necessarily work if that doesn't hold.
-    if best_cost == traceback.cost:
-        move = Move.MATCH
+    return (prev[len2], moves, len1, len2, suffix)
 
-    return Traceback(best_cost, move, traceback)
 
+def _edit_path_numpy(string1, string2, costs):
+    """Fill the move table a row at a time with NumPy.
 
-def _edit_path(string1, string2, cost) -> Traceback:
-    """Determine the transformations required to make the first string the same as the second."""
+    Only integral costs are supported, so that ties are resolved exactly
+    as they are by the pure-Python loop. Provides the distance, the move
+    table (as a memoryview, so it reads as plain ints) and its size.
+    """
     len1 = len(string1)
     len2 = len(string2)
-    (match_cost, ins_cost, del_cost, subst_cost,initial_cost) = (cost[m] for m in Move)
-    distances = dict()
-    distances[0, 0] = Traceback(cost=initial_cost, move=Move.INITIAL, traceback=None)
-
-    # Deletions
-    for i in range(0, len1):
-        so_far = distances[i, 0].cost
-        distances[i + 1, 0] = Traceback(
-            cost=so_far + del_cost, move=Move.DEL, traceback=distances[i, 0]
+    (match_cost, ins_cost, del_cost, subst_cost, initial_cost) = costs
+    codes1 = _code_points(string1)
+    codes2 = _code_points(string2)
+    ins_ramp = np.arange(len2 + 1, dtype=np.int64) * ins_cost
+
+    moves = np.empty((len1 + 1, len2 + 1), dtype=np.uint8)
+    moves[0] = _INS
+    moves[:, 0] = _DEL
+    moves[0, 0] = _INITIAL
+    prev = initial_cost + ins_ramp
+    running = np.empty_like(prev)
+
+    for i in range(len1):
+        increment = np.where(codes1[i] == codes2, match_cost, subst_cost)
+        cost_with_sub = prev[:-1] + increment
+        cost_with_del = prev[1:] + del_cost
+
+        # curr[j] = min(best[j], curr[j - 1] + ins_cost) is a running
+        # minimum once the insertion ramp is factored out.
+        running[0] = prev[0] + del_cost
+        running[1:] = np.minimum(cost_with_sub, cost_with_del) - ins_ramp[1:]
+        curr = np.minimum.accumulate(running) + ins_ramp
+
+        best_cost = curr[1:]
+        cost_with_ins = curr[:-1] + ins_cost
+        took_sub = cost_with_sub == best_cost
+        took_ins = ~took_sub & (cost_with_ins == best_cost)
+        move = np.where(
+            took_sub,
+            np.where(increment != 0, _SUBST, _MATCH),
+            np.where(took_ins, _INS, _DEL),
         )
+        so_far = np.where(took_sub, prev[:-1], np.where(took_ins, curr[:-1], prev[1:]))
+        moves[i + 1, 1:] = move | np.where(best_cost == so_far, _TIED, 0)
+        prev = curr
 
-    # Insertions
+    return (int(prev[-1]), moves.ravel().data, len1, len2)
+
+
+def _edit_path_numba(string1, string2, costs):
+    """Fill the move table with the compiled edit_path_nb kernel.
+
+    Provides the same as _edit_path_numpy.
+    """
+    (total, moves) = _load_numba(len(string1) * len(string2)).edit_path_nb(
+        _code_points(string1), _code_points(string2), tuple(int(c) for c in costs)
+    )
+    return (int(total), moves.ravel().data, len(string1), len(string2))
+
+
+# The Numba kernels once _load_numba has imported them, or False if it can't.
+_numba = None
+
+
+def _load_numba(cells):
+    """Provide the Numba kernels for a table of this many cells, or None.
+
+    None is provided without Numba, for a table too small to be worth a call
+    to the kernels, and, until they're first loaded, for one too small to be
+    worth loading them.
+    """
+    global _numba
+    if np is None or cells < _NUMBA_MIN_CELLS:
+        return None
+    if _numba is None:
+        if cells < _NUMBA_LOAD_MIN_CELLS:
+            return None
+        try:
+            from . import _numba_kernels as _numba
+        except ImportError:
+            _numba = False
+    return _numba or None
+
+
+def _kernel_limit(max_distance):
+    """Convert max_distance to the double the compiled kernels take.
+
+    No limit is infinite, as are limits too big for a double (the
+    Python loops compare those exactly).
+    """
+    if max_distance is None:
+        return math.inf
+    try:
+        return float(max_distance)
+    except OverflowError:
+        return math.inf if max_distance > 0 else -math.inf
+
+
+def _code_points(string):
+    """Return the code points of a string as a NumPy array.
+
+    Code points are compared rather than encoded bytes, as in the
+    pure-Python code. ASCII strings become uint8 arrays, a quarter of the
+    size. Other strings become native-order uint32 arrays, read from
+    UTF-32-LE. Lone surrogates, as produced by os.fsdecode, are kept.
+    """
+    if string.isascii():
+        return np.frombuffer(string.encode("ascii"), dtype=np.uint8)
+    codes = np.frombuffer(string.encode("utf-32-le", "surrogatepass"), dtype="<u4")
+    return codes.astype(np.uint32, copy=False)
+
+
+def _edit_distance_only(string1, string2, cost, max_distance=None):
+    """Determine the edit distance alone, keeping only two rows of the table.
+
+    If max_distance is given, max_distance + 1 is returned as soon as the
+    distance is known to exceed it. (Row minima never decrease with
+    non-negative costs, so a row entirely above the limit ends the search.)
+    """
+    (match_cost, ins_cost, del_cost, subst_cost, initial_cost) = (cost[m] for m in _MOVES)
+
+    # Common prefixes and suffixes don't change the distance when matches
+    # are free.
+    if _free_matches((match_cost, ins_cost, del_cost, subst_cost, initial_cost)):
+        prefix = _common_prefix(string1, string2)
+        suffix = _common_suffix(string1[prefix:], string2[prefix:])
+        string1 = string1[prefix : len(string1) - suffix]
+        string2 = string2[prefix : len(string2) - suffix]
+
+    # Run the shorter string along the rows. Transposing the table swaps
+    # the roles of insertions and deletions, but not the distance.
+    if len(string2) > len(string1):
+        (string1, string2) = (string2, string1)
+        (ins_cost, del_cost) = (del_cost, ins_cost)
+    len2 = len(string2)
+
+    if max_distance is not None and min(match_cost, ins_cost, del_cost, subst_cost) >= 0:
+        # Every surplus character of the longer string has to be deleted.
+        if initial_cost + (len(string1) - len2) * del_cost > max_distance:
+            return max_distance + 1
+
+    costs = (match_cost, ins_cost, del_cost, subst_cost, initial_cost)
+    native = _native_costs(costs, len(string1) + len2)
+    unit = native and (match_cost, ins_cost, del_cost, subst_cost) == (0, 1, 1, 1)
+    if native and edit_distance_c is not None and not (unit and len2 >= _MYERS_MIN_LENGTH_C):
+        result = edit_distance_c(
+            memoryview(string1.encode("utf-32-le", "surrogatepass")).cast("I"),
+            memoryview(string2.encode("utf-32-le", "surrogatepass")).cast("I"),
+            *costs,
+            _kernel_limit(max_distance),
+        )
+    elif (
+        native
+        and not (unit and len2 >= _MYERS_MIN_LENGTH_NUMBA)
+        and _load_numba(len(string1) * len2) is not None
+    ):
+        result = int(
+            _load_numba(len(string1) * len2).edit_distance_nb(
+                _code_points(string1),
+                _code_points(string2),
+                costs,
+                _kernel_limit(max_distance),
+            )
+        )
+    elif unit:
+        result = initial_cost + _myers_unit(string1, string2)
+    elif native and np is not None and len2 >= _NUMPY_DISTANCE_MIN_LENGTH:
+        result = _edit_distance_numpy(string1, string2, costs, max_distance)
+    elif (
+        np is not None
+        and max_distance is None
+        and len2 >= _DIAGONAL_MIN_LENGTH
+        and _diagonal_costs(costs, len(string1) + len2, len2)
+    ):
+        result = _edit_distance_diagonal(string1, string2, costs)
+    else:
+        result = _distance_kernel(costs)(string1, string2, max_distance)
+
+    if max_distance is not None and result > max_distance:
+        return max_distance + 1
+    return result
+
+
+def _myers_unit(string1, string2, peq=None):
+    """Determine the unit-cost edit distance with Myers' bit-parallel algorithm.
+
+    Each column of the table is held as bit vectors of the vertical
+    differences between adjacent cells, one bit per character of string2,
+    so a whole column is updated with a few integer operations (Myers
+    1999, as reformulated by Hyyrö). Python integers are unbounded, so no
+    blocking is needed for strings longer than a machine word.
+
+    Optional peq is the result of _myers_pattern(string2), for reuse
+    across several comparisons.
+    """
+    len2 = len(string2)
+    if not len2:
+        return len(string1)
+
+    if peq is None:
+        peq = _myers_pattern(string2)
+
+    mask = (1 << len2) - 1
+    last = 1 << (len2 - 1)
+    vp = mask
+    vn = 0
+    score = len2
+
+    for char1 in string1:
+        eq = peq.get(char1, 0)
+        d0 = ((((eq & vp) + vp) ^ vp) | eq | vn) & mask
+        hp = (vn | ~(d0 | vp)) & mask
+        hn = vp & d0
+        if hp & last:
+            score += 1
+        elif hn & last:
+            score -= 1
+        hp = ((hp << 1) | 1) & mask
+        hn = (hn << 1) & mask
+        vp = (hn | ~(d0 | hp)) & mask
+        vn = hp & d0
+
+    return score
+
+
+def _myers_pattern(string):
+    """Map each character of a string to the bit mask of its positions."""
+    peq = dict()
+    for (j, char) in enumerate(string):
+        peq[char] = peq.get(char, 0) | (1 << j)
+    return peq
+
+
+def _edit_distance_python(string1, string2, costs, max_distance):
+    """Pure-Python two-row loop for _edit_distance_only.
+
+    Stops early, returning the minimum of the first row over max_distance.
+    """
+    (match_cost, ins_cost, del_cost, subst_cost, initial_cost) = costs
+    len2 = len(string2)
+
+    prev = [initial_cost]
     for j in range(0, len2):
-        so_far = distances[0, j].cost
-        distances[0, j + 1] = Traceback(so_far + ins_cost, Move.INS, distances[0, j])
+        prev.append(prev[j] + ins_cost)
+    curr = [0] * (len2 + 1)
 
-    # Substitutions
-    for i in range(0, len1):
+    for char1 in string1:
+        diag = prev[0]
+        left = curr[0] = diag + del_cost
         for j in range(0, len2):
-            if string1[i] == string2[j]:
-                subst = match_cost
+            up = prev[j + 1]
+            if char1 == string2[j]:
+                best_cost = diag + match_cost
             else:
-                subst = subst_cost
+                best_cost = diag + subst_cost
+            if left + ins_cost < best_cost:
+                best_cost = left + ins_cost
+            if up + del_cost < best_cost:
+                best_cost = up + del_cost
+            curr[j + 1] = left = best_cost
+            diag = up
+        if max_distance is not None and min(curr) > max_distance:
+            return min(curr)
+        (prev, curr) = (curr, prev)
+
+    return prev[len2]
+
+
+# The _edit_distance_python loop, with the costs written in as literals:
+# {match} etc. are either empty, for an int cost of zero, or " + <cost>".
+# Rows are built by appending, and the upper neighbours are zipped in, to
+# save on indexing.
+_DISTANCE_KERNEL_TEMPLATE = """
+def kernel(string1, string2, max_distance):
+    prev = [{initial}]
+    for _ in string2:
+        prev.append(prev[-1]{ins})
+
+    for char1 in string1:
+        diag = prev[0]
+        left = diag{del_}
+        curr = [left]
+        for (char2, up) in zip(string2, prev[1:]):
+            if char1 == char2:
+                best_cost = diag{match}
+            else:
+                best_cost = diag{subst}
+{indels}
+            curr.append(best_cost)
+            left = best_cost
+            diag = up
+        if max_distance is not None and min(curr) > max_distance:
+            return min(curr)
+        prev = curr
+
+    return prev[-1]
+"""
+
+_DISTANCE_KERNEL_INDELS = """\
+            if left{ins} < best_cost:
+                best_cost = left{ins}
+            if up{del_} < best_cost:
+                best_cost = up{del_}"""
+
+# When insertions and deletions cost the same, one addition will do. Ties
+# go to the insertion, as above.
+_DISTANCE_KERNEL_EQUAL_INDELS = """\
+            lower = up if up < left else left
+            if lower{ins} < best_cost:
+                best_cost = lower{ins}"""
+
+
+def _distance_kernel(costs):
+    """Provide a two-row distance loop, specialized for the costs if possible.
+
+    Plain int and finite float costs are written into a compiled copy of
+    the loop as literals, which lets the loop be simplified for them: free
+    matches aren't added at all, and equal insertion and deletion costs
+    are added once. Other numeric types get _edit_distance_python itself.
+    """
+    if all(type(c) in (int, float) and math.isfinite(c) for c in costs):
+        # Keyed on the literals, so that e.g. 1 and 1.0 get their own kernels.
+        return _make_distance_kernel(
+            tuple(repr(c) for c in costs), len({type(c) for c in costs[:4]}) == 1
+        )
+    return lambda string1, string2, max_distance: _edit_distance_python(
+        string1, string2, costs, max_distance
+    )
+
+
+@functools.lru_cache(maxsize=32)
+def _make_distance_kernel(literals, same_types):
+    """Compile _DISTANCE_KERNEL_TEMPLATE for a tuple of cost literals.
 
-            distances[i + 1, j + 1] = _best(
-                Traceback(subst, Move.SUBST if subst else Move.MATCH, distances[i, j]),
-                Traceback(ins_cost, Move.INS, distances[i + 1, j]),
-                Traceback(del_cost, Move.DEL, distances[i, j + 1]),
+    same_types says whether the move costs are all ints or all floats.
+    """
+    (match, ins, del_, subst, initial) = (
+        "" if literal == "0" else " + " + literal for literal in literals
+    )
+    # Sharing the indel addition is only exact if every cell has the same
+    # type, otherwise ties between an int and a float could go either way.
+    if ins == del_ and same_types:
+        indels = _DISTANCE_KERNEL_EQUAL_INDELS.format(ins=ins)
+    else:
+        indels = _DISTANCE_KERNEL_INDELS.format(ins=ins, del_=del_)
+
+    namespace = dict()
+    exec(
+        _DISTANCE_KERNEL_TEMPLATE.format(
+            match=match, ins=ins, del_=del_, subst=subst, initial=literals[4], indels=indels
+        ),
+        namespace,
+    )
+    return namespace["kernel"]
+
+
+def _edit_distance_numpy(string1, string2, costs, max_distance):
+    """NumPy two-row loop for _edit_distance_only; stops early as the pure-Python one does."""
+    (match_cost, ins_cost, del_cost, subst_cost, initial_cost) = costs
+    codes2 = _code_points(string2)
+    ins_ramp = np.arange(len(string2) + 1, dtype=np.int64) * ins_cost
+    prev = initial_cost + ins_ramp
+    running = np.empty_like(prev)
+
+    for code1 in _code_points(string1):
+        # See _edit_path_numpy for the running minimum.
+        increment = np.where(code1 == codes2, match_cost, subst_cost)
+        running[0] = prev[0] + del_cost
+        running[1:] = np.minimum(prev[:-1] + increment, prev[1:] + del_cost) - ins_ramp[1:]
+        prev = np.minimum.accumulate(running) + ins_ramp
+        if max_distance is not None and prev.min() > max_distance:
+            return int(prev.min())
+
+    return int(prev[-1])
+
+
+def _native_costs(costs, length):
+    """Check that the costs are ints small enough for int64 cells.
+
+    This is what the compiled and NumPy kernels need. length is the
+    total length of the two strings. No cell exceeds the biggest cost
+    times one more than that, and the NumPy kernels offset cells by
+    about as much again, hence the halved limit. Other integral types,
+    such as NumPy's, are left to the Python loops, whose sums keep them.
+    """
+    return (
+        all(type(c) is int for c in costs)
+        and max(abs(c) for c in costs) * (length + 2) < 2 ** 62
+    )
+
+
+def _free_matches(costs):
+    """Check whether matched characters at the ends can be left out, given the tuple of costs.
+
+    That holds when matches cost nothing and no edit has a negative
+    cost, so nothing is gained by a detour around a match. The match
+    cost must be the int 0, since adding a zero of another type, such
+    as 0.0, can change the type of the result.
+    """
+    (match_cost, ins_cost, del_cost, subst_cost, _) = costs
+    return type(match_cost) is int and match_cost == 0 and min(ins_cost, del_cost, subst_cost) >= 0
+
+
+def _common_prefix(string1, string2):
+    """Determine the length of the longest common prefix of two strings."""
+    length = 0
+    limit = min(len(string1), len(string2))
+    while length < limit and string1[length] == string2[length]:
+        length += 1
+    return length
+
+
+def _common_suffix(string1, string2):
+    """Determine the length of the longest common suffix of two strings."""
+    length = 0
+    limit = min(len(string1), len(string2))
+    while length < limit and string1[-1 - length] == string2[-1 - length]:
+        length += 1
+    return length
+
+
+def _diagonal_costs(costs, length, len2):
+    """Check that _edit_distance_diagonal suits the costs for strings of these lengths.
+
+    It needs some float costs (all-integer ones are left to the integer
+    kernels), no other types, and int cells staying exact as doubles;
+    length is the total length of the two strings, and len2 that of the
+    shorter.
+    """
+    if not all(type(c) in (int, float) for c in costs):
+        return False
+    floats = sum(type(c) is float for c in costs[:4])
+    if floats == 0:
+        return False
+    if floats < 4 and len2 < _DIAGONAL_MIXED_MIN_LENGTH:
+        return False
+    return max(abs(c) for c in costs) * (length + 1) < 2 ** 53
+
+
+def _edit_distance_diagonal(string1, string2, costs):
+    """Determine the edit distance alone, an anti-diagonal at a time with NumPy.
+
+    The cells of an anti-diagonal (i + j constant) only depend on the two
+    before it, so each one takes a few vectorized operations using the
+    same float arithmetic as the pure-Python loop. This makes it suitable
+    for non-integral costs, unlike the running minimum used by
+    _edit_distance_numpy. When int and float costs are mixed, it also
+    tracks which cells Python would have computed as floats, so the
+    result has the same type.
+    """
+    (match_cost, ins_cost, del_cost, subst_cost, initial_cost) = costs
+    (match_float, ins_float, del_float, subst_float, initial_float) = (
+        isinstance(c, float) for c in costs
+    )
+    mixed = not (match_float == ins_float == del_float == subst_float)
+    len1 = len(string1)
+    len2 = len(string2)
+    codes1 = _code_points(string1)
+    codes2 = _code_points(string2)[::-1]
+
+    # Diagonals are indexed by i; curr is diagonal k, and prev and before
+    # are k - 1 and k - 2.
+    (before, prev, curr) = (np.zeros(len1 + 1) for _ in range(3))
+    (before_floats, prev_floats, curr_floats) = (
+        np.zeros(len1 + 1, dtype=bool) for _ in range(3)
+    )
+    curr[0] = initial_cost
+    curr_floats[0] = initial_float
+
+    for k in range(1, len1 + len2 + 1):
+        (before, prev, curr) = (prev, curr, before)
+        (before_floats, prev_floats, curr_floats) = (prev_floats, curr_floats, before_floats)
+
+        # Insertions and deletions along the edges of the table.
+        if k <= len2:
+            curr[0] = prev[0] + ins_cost
+            curr_floats[0] = prev_floats[0] or ins_float
+        if k <= len1:
+            curr[k] = prev[k - 1] + del_cost
+            curr_floats[k] = prev_floats[k - 1] or del_float
+
+        low = max(1, k - len2)
+        high = min(len1, k - 1)
+        if low > high:
+            continue
+
+        # Cell (i, j) compares string1[i - 1] with string2[j - 1], j = k - i,
+        # which is string2 reversed at len2 - k + i.
+        matches = codes1[low - 1 : high] == codes2[len2 - k + low : len2 - k + high + 1]
+        cost_with_sub = before[low - 1 : high] + np.where(matches, match_cost, subst_cost)
+        cost_with_ins = prev[low : high + 1] + ins_cost
+        cost_with_del = prev[low - 1 : high] + del_cost
+        best_cost = np.minimum(np.minimum(cost_with_sub, cost_with_ins), cost_with_del)
+        curr[low : high + 1] = best_cost
+
+        if mixed:
+            # Ties go to the substitution, then the insertion, as in the
+            # pure-Python loop.
+            floats = np.where(
+                cost_with_sub == best_cost,
+                before_floats[low - 1 : high] | np.where(matches, match_float, subst_float),
+                np.where(
+                    cost_with_ins == best_cost,
+                    prev_floats[low : high + 1] | ins_float,
+                    prev_floats[low - 1 : high] | del_float,
+                ),
             )
+            curr_floats[low : high + 1] = floats
 
-    return distances[len1, len2]
+    if mixed:
+        floats = curr_floats[len1]
+    else:
+        floats = initial_float or (match_float and len1 + len2 > 0)
+    return float(curr[len1]) if floats else int(curr[len1])
 
 
-def _list_edits(raw_edits: Traceback) -> List[Move]:
-    """Create a list of the edits made."""
+def _list_edits(moves, len1, len2, suffix) -> List[Move]:
+    """Create a list of the edits made, walking the move table back from the final cell."""
     just_edits = list()
+    cols = len2 + 1
+    i = len1
+    j = len2
 
     # (We don't bother reporting the initial match, as that's pointless.)
-    while raw_edits.traceback is not None:
-        just_edits.insert(0, raw_edits.move)
-        raw_edits = raw_edits.traceback
+    while i or j:
+        code = moves[i * cols + j]
+        step = code & 3
+        just_edits.append(_MOVES[_MATCH if code & _TIED else step])
+        if step == _INS:
+            j -= 1
+        elif step == _DEL:
+            i -= 1
+        else:
+            i -= 1
+            j -= 1
 
+    just_edits.reverse()
+    just_edits.extend([Move.MATCH] * suffix)
     return just_edits
 
 
+def _valid_cost(cost) -> bool:
+    """Check that the costs of the edits are all numbers."""
+    return (
+        isinstance(cost[Move.MATCH], numbers.Real)
+        and isinstance(cost[Move.INS], numbers.Real)
+        and isinstance(cost[Move.DEL], numbers.Real)
+        and isinstance(cost[Move.SUBST], numbers.Real)
+    )
+
+
 def distance(
     string1: str,
     string2: str,
     output="both",
     cost={Move.MATCH: 0, Move.INS: 1, Move.DEL: 1, Move.SUBST: 1, Move.INITIAL:0},
+    max_distance=None,
 ) -> Union[int, List[Move], Tuple[int, List[Move]]]:
     """Determine the weighted edit distance between two strings.
 
@@ -155,6 +762,11 @@ def distance(
     (It is not recommended that match costs be adjusted: the algorithm
     is predicated on match having a lower cost than other operations.)
 
+    Optional max_distance is a number which makes the search stop once
+    the distance is known to exceed it, in which case max_distance + 1
+    is returned. It can only be used with the "distance" output, and
+    assumes costs are not negative.
+
     The results vary depending on the output option:
         "distance": provides the edit distance as a number.
         "edits": provides an array with the list of edit actions.
@@ -166,22 +778,78 @@ def distance(
 
     if output != "both" and output != "distance" and output != "edits":
         raise BrewDistanceException("Brew-Distance: invalid output parameter supplied.")
-    elif (
-        not isinstance(cost[Move.MATCH], numbers.Real)
-        or not isinstance(cost[Move.INS], numbers.Real)
-        or not isinstance(cost[Move.DEL], numbers.Real)
-        or not isinstance(cost[Move.SUBST], numbers.Real)
-    ):
+    elif not _valid_cost(cost):
         raise BrewDistanceException("Brew-Distance: invalid cost parameter supplied.")
+    elif max_distance is not None and (
+        not isinstance(max_distance, numbers.Real) or output != "distance"
+    ):
+        raise BrewDistanceException("Brew-Distance: invalid max_distance parameter supplied.")
+    elif output == "distance":
+        return _edit_distance_only(string1, string2, cost, max_distance)
     else:
-        results = _edit_path(string1, string2, cost)
+        (total, *table) = _edit_path(string1, string2, cost)
 
-        if output == "distance":
-            return results[0]
-        elif output == "edits":
-            return _list_edits(results)
+        if output == "edits":
+            return _list_edits(*table)
         else:
-            return (results[0], _list_edits(results))
+            return (total, _list_edits(*table))
+
+
+def distances_one_to_many(
+    query: str,
+    candidates: Sequence[str],
+    cost={Move.MATCH: 0, Move.INS: 1, Move.DEL: 1, Move.SUBST: 1, Move.INITIAL:0},
+    max_distance=None,
+) -> List[Union[int, float]]:
+    """Determine the weighted edit distances from one string to many.
+
+    query is the string to be transformed.
+
+    candidates is a sequence of transformation targets.
+
+    Optional cost and max_distance are as for distance().
+
+    Provides a list of the edit distances, in the same order as the
+    candidates. The results are those of distance() with the "distance"
+    output for each candidate in turn, but the arguments are validated
+    and the query prepared just once. If NumPy and Numba are installed
+    and the costs are integers, the candidates are compared in parallel.
+    """
+    if not isinstance(query, str) or not all(isinstance(c, str) for c in candidates):
+        raise BrewDistanceException("Brew-Distance: non-string input supplied.")
+    elif not _valid_cost(cost):
+        raise BrewDistanceException("Brew-Distance: invalid cost parameter supplied.")
+    elif max_distance is not None and not isinstance(max_distance, numbers.Real):
+        raise BrewDistanceException("Brew-Distance: invalid max_distance parameter supplied.")
+
+    costs = tuple(cost[m] for m in _MOVES)
+    integral = all(type(c) is int for c in costs)
+    lengths = [len(c) for c in candidates]
+    cells = len(query) * sum(lengths)
+    if (
+        integral
+        and _native_costs(costs, len(query) + max(lengths, default=0))
+        and _load_numba(cells) is not None
+    ):
+        offsets = np.zeros(len(candidates) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        results = _load_numba(cells).distances_one_to_many_nb(
+            _code_points(query),
+            _code_points("".join(candidates)),
+            offsets,
+            tuple(int(c) for c in costs),
+            _kernel_limit(max_distance),
+        ).tolist()
+    elif integral and costs[:4] == (0, 1, 1, 1) and edit_distance_c is None:
+        # Unit costs are symmetric, so the query can be the pattern for all.
+        peq = _myers_pattern(query)
+        results = [costs[4] + _myers_unit(c, query, peq) for c in candidates]
+    else:
+        return [_edit_distance_only(query, c, cost, max_distance) for c in candidates]
+
+    if max_distance is not None:
+        results = [max_distance + 1 if r > max_distance else r for r in results]
+    return results
 
 
 if __name__ == "__main__":
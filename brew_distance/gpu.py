@@ -0,0 +1,184 @@
+"""Calculate many unit-cost edit distances at once on a CUDA GPU."""
+
+# Copyright (C) 2017, 2018 David H. Gutteridge.
+# This program is free software; you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation; either version 2 of the License, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin St, Fifth Floor, Boston, MA 02110-1301 USA.
+
+from typing import Sequence
+
+from .brew_distance import BrewDistanceException, distances_one_to_many
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import numba
+    from numba import cuda
+except ImportError:
+    cuda = None
+
+__all__ = ("pairwise_distance",)
+
+# Queries of up to this many 64-bit words (256 characters) are handled by
+# the GPU; the bit vectors of a thread's column live in local arrays, whose
+# size must be fixed when the kernel is compiled.
+_WORDS = 4
+_THREADS = (16, 16)
+
+
+def _cuda_ready():
+    """Whether a CUDA device can be used."""
+    return cuda is not None and cuda.is_available()
+
+
+if cuda is not None:
+
+    @cuda.jit(device=True)
+    def _myers_blocks(peq, words, last, ids, vp, vn):
+        """Unit-cost edit distance by Myers' algorithm over blocks of 64 bits.
+
+        peq[w, c] is the mask of the positions of character id c in word w of
+        the query, which is words words long, with its final position at bit
+        last of the final word. ids are the target's character ids. vp and
+        vn are scratch arrays of at least words words (Hyyrö 2003).
+        """
+        one = numba.uint64(1)
+        zero = numba.uint64(0)
+        top = numba.uint64(63)
+        score = 0
+        for w in range(words):
+            vp[w] = ~zero
+            vn[w] = zero
+            score += 64
+        score -= 63 - last
+
+        for k in range(ids.shape[0]):
+            c = ids[k]
+            hp_carry = one
+            hn_carry = zero
+            for w in range(words):
+                eq = peq[w, c]
+                x = eq | hn_carry
+                d0 = (((x & vp[w]) + vp[w]) ^ vp[w]) | x | vn[w]
+                hp = vn[w] | ~(d0 | vp[w])
+                hn = vp[w] & d0
+                hp_in = hp_carry
+                hn_in = hn_carry
+                if w < words - 1:
+                    hp_carry = hp >> top
+                    hn_carry = hn >> top
+                else:
+                    hp_carry = (hp >> numba.uint64(last)) & one
+                    hn_carry = (hn >> numba.uint64(last)) & one
+                hp = (hp << one) | hp_in
+                hn = (hn << one) | hn_in
+                vp[w] = hn | ~(d0 | hp)
+                vn[w] = hp & d0
+            score += numba.int64(hp_carry) - numba.int64(hn_carry)
+        return score
+
+    @cuda.jit
+    def _pairwise_kernel(peq, lengths, ids, offsets, out):
+        """Fill out[q, t] with the distance from query q to target t.
+
+        Each thread handles one pair. The targets' character ids are
+        concatenated in ids, with target t at ids[offsets[t]:offsets[t + 1]].
+        """
+        (t, q) = cuda.grid(2)
+        if q >= out.shape[0] or t >= out.shape[1]:
+            return
+        target = ids[offsets[t] : offsets[t + 1]]
+        length = lengths[q]
+        if length == 0:
+            out[q, t] = target.shape[0]
+            return
+        vp = cuda.local.array(_WORDS, numba.uint64)
+        vn = cuda.local.array(_WORDS, numba.uint64)
+        out[q, t] = _myers_blocks(
+            peq[q], (length + 63) // 64, (length - 1) % 64, target, vp, vn
+        )
+
+
+def _pattern_masks(queries, alphabet):
+    """Build the peq masks of the queries for _pairwise_kernel.
+
+    alphabet maps each character of the queries to its id. Characters
+    missing from every query all share the id len(alphabet), whose masks
+    are empty.
+    """
+    peq = np.zeros((len(queries), _WORDS, len(alphabet) + 1), dtype=np.uint64)
+    for (q, query) in enumerate(queries):
+        for (j, char) in enumerate(query):
+            peq[q, j // 64, alphabet[char]] |= np.uint64(1 << (j % 64))
+    return peq
+
+
+def pairwise_distance(queries: Sequence[str], targets: Sequence[str]) -> "np.ndarray":
+    """Determine the unit-cost edit distance of every query to every target.
+
+    Provides an integer array with a row per query and a column per target,
+    holding the results of distance() with the "distance" output and the
+    default costs. If Numba can use a CUDA device, each pair is compared by
+    its own GPU thread; queries longer than 256 characters, and all pairs
+    when no device is available, are compared with distances_one_to_many().
+    Requires NumPy.
+    """
+    if np is None:
+        raise BrewDistanceException("Brew-Distance: pairwise_distance requires NumPy.")
+    if not all(isinstance(s, str) for s in queries) or not all(
+        isinstance(s, str) for s in targets
+    ):
+        raise BrewDistanceException("Brew-Distance: non-string input supplied.")
+
+    out = np.empty((len(queries), len(targets)), dtype=np.int64)
+    if not targets:
+        return out
+    on_gpu = []
+    if _cuda_ready():
+        on_gpu = [q for (q, query) in enumerate(queries) if len(query) <= 64 * _WORDS]
+
+    if on_gpu:
+        gpu_queries = [queries[q] for q in on_gpu]
+        alphabet = dict()
+        for query in gpu_queries:
+            for char in query:
+                alphabet.setdefault(char, len(alphabet))
+        other = len(alphabet)
+        joined = "".join(targets)
+        ids = np.fromiter((alphabet.get(c, other) for c in joined), dtype=np.int32, count=len(joined))
+        lengths = np.fromiter((len(t) for t in targets), dtype=np.int64, count=len(targets))
+        offsets = np.zeros(len(targets) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+
+        results = cuda.device_array((len(gpu_queries), len(targets)), dtype=np.int64)
+        blocks = (
+            (len(targets) + _THREADS[0] - 1) // _THREADS[0],
+            (len(gpu_queries) + _THREADS[1] - 1) // _THREADS[1],
+        )
+        _pairwise_kernel[blocks, _THREADS](
+            cuda.to_device(_pattern_masks(gpu_queries, alphabet)),
+            cuda.to_device(np.array([len(q) for q in gpu_queries], dtype=np.int64)),
+            cuda.to_device(ids),
+            cuda.to_device(offsets),
+            results,
+        )
+        out[on_gpu] = results.copy_to_host()
+
+    done = set(on_gpu)
+    for (q, query) in enumerate(queries):
+        if q not in done:
+            out[q] = distances_one_to_many(query, targets)
+    return out
@@ -1,29 +1,4 @@
 from enum import Enum
-from typing import NamedTuple, Optional
-
-
-def sdist(string1, string2):
-    delCost = 1.0
-    insCost = 1.0
-    substCost = 1.0
-    m = len(string1)
-    n = len(string2)
-    d = dict()
-    d[0, 0] = 0.0
-    for i in range(m):
-        d[i + 1, 0] = d[i, 0] + delCost
-    for j in range(n):
-        d[0, j + 1] = d[0, j] + insCost
-    for i in range(m):
-        for j in range(n):
-            if string1[i] == string2[j]:
-                subst = 0
-            else:
-                subst = substCost
-            d[i + 1, j + 1] = min(
-                d[i, j] + subst, d[i + 1, j] + insCost, d[i, j + 1] + delCost
-            )
-    return d[m, n]
 
 
 class Move(Enum):
@@ -34,74 +9,103 @@ class Move(Enum):
     INITIAL = 4
 
 
-class Traceback(NamedTuple):
-    cost: int
-    move: Move
-    traceback: Optional["Traceback"]
-
-
-def edit_path(string1, string2) -> Traceback:
-    len1 = len(string1)
-    len2 = len(string2)
-    match_cost = 0
-    ins_cost = 1
-    del_cost = 1
-    subst_cost = 1
-    initial_cost = 0
-    distances = dict()
-    distances[0, 0] = Traceback(cost=initial_cost, move=Move.INITIAL, traceback=None)
-
-    # Deletions
-    for i in range(0, len1):
-        so_far = distances[i, 0].cost
-        distances[i + 1, 0] = Traceback(
-            cost=so_far + del_cost, move=Move.DEL, traceback=distances[i, 0]
-        )
-
-    # Insertions
-    for j in range(0, len2):
-        so_far = distances[0, j].cost
-        distances[0, j + 1] = Traceback(so_far + ins_cost, Move.INS, distances[0, j])
-
-    # Substitutions
-    for i in range(0, len1):
-        for j in range(0, len2):
-            if string1[i] == string2[j]:
-                subst = match_cost
+def _dp(string1, string2, costs, want_path):
+    """
+    Fill in the edit distance table, a row at a time.
+
+    costs is a tuple of the insertion, deletion, substitution
+    and initial costs. Returns the distance, and, if want_path
+    is set, the flat table of the Move values taken into each
+    cell (otherwise None). Only two rows of costs are kept.
+    """
+    (insCost, delCost, substCost, initialCost) = costs
+    m = len(string1)
+    n = len(string2)
+    moves = bytearray((m + 1) * (n + 1)) if want_path else None
+
+    prev = [initialCost]
+    for j in range(n):
+        prev.append(prev[j] + insCost)
+    if want_path:
+        moves[0] = Move.INITIAL.value
+        for j in range(n):
+            moves[j + 1] = Move.INS.value
+
+    # The loop works with the plain values of the moves; they are
+    # only turned back into Move members by extract_path. The three
+    # neighbouring cells are carried along in locals, rather than
+    # being indexed out of the rows for each cell.
+    match, ins, dele, subst_move = (Move.MATCH.value, Move.INS.value,
+                                    Move.DEL.value, Move.SUBST.value)
+    for (i, char1) in enumerate(string1):
+        diag = prev[0]
+        left = diag + delCost
+        curr = [left]
+        k = (i + 1) * (n + 1)
+        if want_path:
+            moves[k] = dele
+        for (char2, up) in zip(string2, prev[1:]):
+            k += 1
+            if char1 == char2:
+                best = diag
+                move = match
             else:
-                subst = subst_cost
+                best = diag + substCost
+                move = subst_move
+            if left + insCost < best:
+                best = left + insCost
+                move = ins
+            if up + delCost < best:
+                best = up + delCost
+                move = dele
+            curr.append(best)
+            if want_path:
+                moves[k] = move
+            diag = up
+            left = best
+        prev = curr
+
+    return prev[n], moves
 
-            distances[i + 1, j + 1] = best(
-                Traceback(subst, Move.SUBST if subst else Move.MATCH, distances[i, j]),
-                Traceback(ins_cost, Move.INS, distances[i + 1, j]),
-                Traceback(del_cost, Move.DEL, distances[i, j + 1]),
-            )
 
-    return extract_path(distances[len1, len2])
+def sdist(string1, string2):
+    return _dp(string1, string2, (1.0, 1.0, 1.0, 0.0), want_path=False)[0]
+
+
+def edit_path(string1, string2):
+    costs = (1, 1, 1, 0)
+    _, moves = _dp(string1, string2, costs, want_path=True)
+    return extract_path(moves, len(string1), len(string2), costs)
 
 
-def extract_path(tb:Traceback):
+def extract_path(moves, m, n, costs):
     """
     Extract the series of operations that
-    maps one string to the other.
+    maps one string to the other, each with
+    the cost so far.
     """
-    result = []
-    while tb.move != Move.INITIAL:
-        result.append((tb.cost,tb.move))
-        tb = tb.traceback
-    ops = result[::-1]
+    (insCost, delCost, substCost, initialCost) = costs
+    steps = []
+    i, j = m, n
+    while i or j:
+        move = Move(moves[i * (n + 1) + j])
+        steps.append(move)
+        if move == Move.INS:
+            j -= 1
+        elif move == Move.DEL:
+            i -= 1
+        else:
+            i -= 1
+            j -= 1
+    increments = {Move.MATCH: 0, Move.INS: insCost, Move.DEL: delCost, Move.SUBST: substCost}
+    ops = []
+    cost = initialCost
+    for move in reversed(steps):
+        cost += increments[move]
+        ops.append((cost, move))
     return ops
 
 
-def best(sub_move, ins_move, del_move):
-    chosen = sub_move
-    if ins_move.cost < chosen.cost:
-        chosen = ins_move
-    if del_move.cost < chosen.cost:
-        chosen = del_move
-    return chosen
-
-
 if __name__ == "__main__":
     print("foo", "foot", sdist("foo", "foot"))
     print("foo", "foo", sdist("foo", "foo"))
@@ -18,9 +18,15 @@
 # 51 Franklin St, Fifth Floor, Boston, MA 02110-1301 USA.
 
 from __future__ import unicode_literals
+import math
+import os
+import random
+import subprocess
 import sys
 import unittest
-from .. import brew_distance, BrewDistanceException
+from fractions import Fraction
+from unittest import mock
+from .. import brew_distance, gpu, string_distance, BrewDistanceException
 
 class TestBrew(unittest.TestCase):
     """Class to hold all the tests for this package."""
@@ -117,5 +123,342 @@ class TestBrew(unittest.TestCase):
             with self.assertRaises(BrewDistanceException):
                 brew_distance.distance(75, 67)
 
+    def test_brew16(self):
+        """Test edit distance between 'kitten' and 'sitting' with a maximum distance."""
+        self.assertTrue(brew_distance.distance("kitten", "sitting", "distance", max_distance=3) == 3)
+        self.assertTrue(brew_distance.distance("kitten", "sitting", "distance", max_distance=2) == 3)
+        self.assertTrue(brew_distance.distance("kitten", "sitting", "distance", max_distance=0) == 1)
+
+    def test_brew17(self):
+        """Test error handling of a maximum distance with edits output."""
+        with self.assertRaises(BrewDistanceException):
+            brew_distance.distance("kitten", "sitting", "both", max_distance=3)
+
+    def test_brew18(self):
+        """Test edit distances between 'foo' and several candidates at once."""
+        expected = [0, 3, 3, 1]
+        self.assertTrue(brew_distance.distances_one_to_many("foo", ["foo", "bar", "foobar", "fou"]) == expected)
+
+    @unittest.skipIf(gpu.np is None, "requires NumPy")
+    def test_brew19(self):
+        """Test edit distances between every pair of two lists of strings."""
+        expected = [[0, 3, 1], [3, 1, 3]]
+        self.assertTrue(gpu.pairwise_distance(["foo", "bat"], ["foo", "bar", "fou"]).tolist() == expected)
+
+    def test_brew20(self):
+        """Test edit distance between strings holding a lone surrogate."""
+        expected = (1, [brew_distance.Move.MATCH] * 3 + [brew_distance.Move.SUBST])
+        self.assertTrue(brew_distance.distance("caf\udce9", "cafe", "both") == expected)
+        self.assertTrue(brew_distance.distance("caf\udce9", "cafe", "distance") == 1)
+        self.assertTrue(brew_distance.distances_one_to_many("caf\udce9", ["cafe", "caf\udce9"]) == [1, 0])
+
+    def test_brew21(self):
+        """Test a maximum distance too big to convert to a float."""
+        self.assertTrue(brew_distance.distance("abc", "abd", "distance", max_distance=10 ** 400) == 1)
+        self.assertTrue(brew_distance.distance("abc", "abd", "distance", max_distance=-10 ** 400) == 1 - 10 ** 400)
+        # Long enough for the Numba kernels too, if they're available.
+        (foo, bar) = ("foo" * 200, "bar" * 200)
+        with mock.patch.object(brew_distance, "_NUMBA_LOAD_MIN_CELLS", 0):
+            self.assertTrue(brew_distance.distance(foo, bar, "distance", max_distance=10 ** 400) == 600)
+            self.assertTrue(brew_distance.distances_one_to_many(foo, [bar, foo], max_distance=10 ** 400) == [600, 0])
+
+    def test_brew22(self):
+        """Test that the Numba kernels aren't loaded for small tables."""
+        with mock.patch.object(brew_distance, "_numba", None):
+            brew_distance.distance("kitten" * 10, "sitting" * 10, "both")
+            brew_distance.distances_one_to_many("kitten" * 10, ["sitting" * 10] * 10)
+            self.assertIsNone(brew_distance._numba)
+
+
+def _reference_distance(string1, string2, costs):
+    """Determine the edit distance with a plain two-row loop, for checking the faster ones."""
+    (match_cost, ins_cost, del_cost, subst_cost, initial_cost) = costs
+    prev = [initial_cost]
+    for j in range(len(string2)):
+        prev.append(prev[j] + ins_cost)
+    for char1 in string1:
+        curr = [prev[0] + del_cost]
+        for j in range(len(string2)):
+            best = prev[j] + (match_cost if char1 == string2[j] else subst_cost)
+            if curr[j] + ins_cost < best:
+                best = curr[j] + ins_cost
+            if prev[j + 1] + del_cost < best:
+                best = prev[j + 1] + del_cost
+            curr.append(best)
+        prev = curr
+    return prev[-1]
+
+
+def _reference_edits(string1, string2, costs):
+    """Determine the edit distance and edits from the whole table, for checking the faster code."""
+    (match_cost, ins_cost, del_cost, subst_cost, initial_cost) = costs
+    Move = brew_distance.Move
+    # Each cell holds its cost, the move into it and the cell it came from.
+    table = {(0, 0): (initial_cost, None, None)}
+    for i in range(len(string1)):
+        table[i + 1, 0] = (table[i, 0][0] + del_cost, Move.DEL, (i, 0))
+    for j in range(len(string2)):
+        table[0, j + 1] = (table[0, j][0] + ins_cost, Move.INS, (0, j))
+    for i in range(len(string1)):
+        for j in range(len(string2)):
+            subst = match_cost if string1[i] == string2[j] else subst_cost
+            best = (table[i, j][0] + subst, Move.SUBST if subst else Move.MATCH, (i, j))
+            for option in (
+                (table[i + 1, j][0] + ins_cost, Move.INS, (i + 1, j)),
+                (table[i, j + 1][0] + del_cost, Move.DEL, (i, j + 1)),
+            ):
+                if option[0] < best[0]:
+                    best = option
+            if best[0] == table[best[2]][0]:
+                best = (best[0], Move.MATCH, best[2])
+            table[i + 1, j + 1] = best
+
+    edits = list()
+    cell = (len(string1), len(string2))
+    while table[cell][2] is not None:
+        edits.insert(0, table[cell][1])
+        cell = table[cell][2]
+    return (table[len(string1), len(string2)][0], edits)
+
+
+# The module attributes to replace to run without each optional accelerator,
+# cumulatively: Cython, then Numba, then NumPy.
+_WITHOUT = (
+    ("edit_distance_c", None),
+    ("_load_numba", lambda cells: None),
+    ("np", None),
+)
+
+
+class TestBackends(unittest.TestCase):
+    """Check each implementation against the reference, hiding the accelerators in turn."""
+
+    costs = (
+        (0, 1, 1, 1, 0),
+        (0, 2, 3, 1, 0),
+        (1, 1, 1, 1, 2),
+        (0, 1, 1, Fraction(1, 2), 0),
+        (0.0, 1.0, 1.0, 1.5, 0.0),
+        (0, 1, 2, 0.5, 0.25),
+        (Fraction(0), Fraction(1, 3), 1, Fraction(3, 4), 0),
+    )
+
+    def backends(self):
+        """Provide (name, context manager) for each set of accelerators."""
+        # The Numba kernels are loaded however small the table, to test them.
+        yield ("all available", mock.patch.object(brew_distance, "_NUMBA_LOAD_MIN_CELLS", 0))
+        for hidden in range(1, len(_WITHOUT) + 1):
+            names = dict(_WITHOUT[:hidden])
+            yield ("without " + ", ".join(names), mock.patch.multiple(brew_distance, **names))
+
+    # Fractions always take the generic Python loop, so they're left out for
+    # the long strings which select the other kernels.
+    long_costs = (costs[1], costs[4], costs[5])
+
+    def check(self, string1, string2, output, costs=costs):
+        """Compare distance() with the reference for each set of costs and accelerators."""
+        for costs in costs:
+            cost = dict(zip(brew_distance.Move, costs))
+            if output == "distance":
+                expected = _reference_distance(string1, string2, costs)
+            else:
+                expected = _reference_edits(string1, string2, costs)
+            for (name, backend) in self.backends():
+                with self.subTest(backend=name, costs=costs, lengths=(len(string1), len(string2))):
+                    with backend:
+                        result = brew_distance.distance(string1, string2, output, cost)
+                    self.assertEqual(expected, result)
+                    if output == "distance":
+                        self.assertIs(type(expected), type(result))
+                    else:
+                        self.assertIs(type(expected[0]), type(result[0]))
+
+    def test_short(self):
+        """Test both outputs for short strings."""
+        rng = random.Random(1)
+        for length in (0, 1, 3, 8, 12):
+            string1 = "".join(rng.choice("abc\u00e9") for _ in range(length))
+            string2 = "".join(rng.choice("abc") for _ in range(rng.randint(0, length + 2)))
+            for output in ("distance", "both"):
+                self.check(string1, string2, output)
+
+    def test_long_edits(self):
+        """Test edits for strings long enough for the NumPy kernel."""
+        rng = random.Random(2)
+        length = brew_distance._NUMPY_EDITS_MIN_LENGTH + 4
+        string1 = "".join(rng.choice("abcd") for _ in range(length))
+        string2 = string1[:40] + "dcba" + string1[44:] + "\u00e9"
+        self.check(string1, string2, "both", self.long_costs)
+
+    def test_long_distance(self):
+        """Test the distance for strings long enough for the NumPy and anti-diagonal kernels."""
+        rng = random.Random(3)
+        length = brew_distance._DIAGONAL_MIXED_MIN_LENGTH + 4
+        string1 = "".join(rng.choice("abcd") for _ in range(length))
+        string2 = "".join(rng.choice("abcd\u00e9") for _ in range(length + 3))
+        self.check(string1, string2, "distance", self.long_costs)
+
+    def test_myers(self):
+        """Test unit costs for strings long enough for the bit-parallel search."""
+        rng = random.Random(4)
+        length = max(brew_distance._MYERS_MIN_LENGTH_C, brew_distance._MYERS_MIN_LENGTH_NUMBA) + 8
+        string1 = "".join(rng.choice("abcd") for _ in range(length))
+        string2 = "".join(rng.choice("abcd\u00e9") for _ in range(length + 5))
+        self.check(string1, string2, "distance", ((0, 1, 1, 1, 0), (0, 1, 1, 1, 2)))
+
+        # Deleting a tail is the only way to reach a prefix of the query.
+        candidates = [string1, string1[:-70], string2[:9] + string1]
+        for (name, backend) in self.backends():
+            with self.subTest(backend=name):
+                with backend:
+                    result = brew_distance.distances_one_to_many(string1, candidates)
+                self.assertEqual([0, 70, 9], result)
+
+    def test_distance_kernels(self):
+        """Test the pure-Python distance loops specialized for their costs."""
+        rng = random.Random(5)
+        pairs = [
+            ("".join(rng.choice("abc") for _ in range(n)), "".join(rng.choice("abc") for _ in range(n + 2)))
+            for n in (0, 5, 20)
+        ]
+        # Equal indels, in one type and (not sharing the addition) mixed; the
+        # same values as ints and as floats; a non-finite cost, which can't
+        # be written in as a literal; and a match cost that isn't free.
+        costs = (
+            (0, 1, 1, 2, 0),
+            (0, 1, 1, 0.5, 0),
+            (0, 1, 1.0, 1, 0),
+            (0.0, 1.0, 1.0, 1.0, 0.0),
+            (0, 2, 1, 1, 0),
+            (0, math.inf, 1, 1, 0),
+            (3, 1, 1, 1, 0.5),
+        )
+        with mock.patch.multiple(brew_distance, **dict(_WITHOUT)):
+            for costs in costs:
+                cost = dict(zip(brew_distance.Move, costs))
+                for (string1, string2) in pairs:
+                    with self.subTest(costs=costs, strings=(string1, string2)):
+                        expected = _reference_distance(string1, string2, costs)
+                        result = brew_distance.distance(string1, string2, "distance", cost)
+                        self.assertEqual(expected, result)
+                        self.assertIs(type(expected), type(result))
+                        limited = brew_distance.distance(
+                            string1, string2, "distance", cost, max_distance=expected - 1
+                        )
+                        self.assertEqual(expected, limited)
+                        if expected > 0:
+                            self.assertEqual(
+                                1, brew_distance.distance(string1, string2, "distance", cost, max_distance=0)
+                            )
+
+    @unittest.skipIf(brew_distance.np is None, "requires NumPy")
+    def test_numpy_costs(self):
+        """Test that NumPy integer costs give the same types of result with every backend."""
+        np = brew_distance.np
+        cost = dict(zip(brew_distance.Move, (np.int64(0), np.int64(1), np.int32(2), np.int64(1), 0)))
+        for (string1, string2) in (("kitten", "sitting"), ("kitten" * 30, "sitting" * 30)):
+            expected = _reference_distance(string1, string2, (0, 1, 2, 1, 0))
+            for (name, backend) in self.backends():
+                with self.subTest(backend=name, lengths=(len(string1), len(string2))):
+                    with backend:
+                        results = [
+                            brew_distance.distance(string1, string2, "distance", cost),
+                            brew_distance.distance(string1, string2, "both", cost)[0],
+                            brew_distance.distances_one_to_many(string1, [string2], cost)[0],
+                        ]
+                    for result in results:
+                        self.assertEqual(expected, result)
+                        self.assertIs(np.int64, type(result))
+
+
+class TestStringDistance(unittest.TestCase):
+    """Tests for the simpler string_distance module."""
+
+    def test_sdist(self):
+        """Test unit-cost distances against the reference."""
+        rng = random.Random(6)
+        for _ in range(50):
+            string1 = "".join(rng.choice("abc") for _ in range(rng.randint(0, 9)))
+            string2 = "".join(rng.choice("abc") for _ in range(rng.randint(0, 9)))
+            expected = _reference_distance(string1, string2, (0, 1.0, 1.0, 1.0, 0.0))
+            self.assertEqual(expected, string_distance.sdist(string1, string2))
+
+    def test_edit_path(self):
+        """Test that the edits, applied in turn, transform one string into the other."""
+        Move = string_distance.Move
+        expected = [(0, Move.MATCH), (0, Move.MATCH), (0, Move.MATCH), (1, Move.INS)]
+        self.assertEqual(expected, string_distance.edit_path("foo", "foot"))
+
+        increments = {Move.MATCH: 0, Move.INS: 1, Move.DEL: 1, Move.SUBST: 1}
+        rng = random.Random(7)
+        for _ in range(50):
+            string1 = "".join(rng.choice("abc") for _ in range(rng.randint(0, 9)))
+            string2 = "".join(rng.choice("abc") for _ in range(rng.randint(0, 9)))
+            (i, j, so_far) = (0, 0, 0)
+            for (cost, move) in string_distance.edit_path(string1, string2):
+                so_far += increments[move]
+                self.assertEqual(so_far, cost)
+                if move == Move.MATCH:
+                    self.assertEqual(string1[i], string2[j])
+                elif move == Move.SUBST:
+                    self.assertNotEqual(string1[i], string2[j])
+                i += move != Move.INS
+                j += move != Move.DEL
+            self.assertEqual((len(string1), len(string2)), (i, j))
+            self.assertEqual(string_distance.sdist(string1, string2), so_far)
+
+
+# Run in a fresh interpreter, as Numba's CUDA simulator must be chosen before
+# numba.cuda is first imported.
+_SIMULATED_PAIRWISE = """
+import warnings
+import numpy as np
+from brew_distance import brew_distance, gpu
+from brew_distance.test.test import TestGPU
+warnings.simplefilter("ignore", RuntimeWarning)  # The simulator warns when uint64 sums wrap.
+assert gpu._cuda_ready()
+# The kernel handles empty queries itself; longer ones than 256 are left to the CPU.
+queries = TestGPU.queries + ["", "a" * 257]
+expected = [[brew_distance.distance(q, t, "distance") for t in TestGPU.targets] for q in queries]
+np.testing.assert_array_equal(expected, gpu.pairwise_distance(queries, TestGPU.targets))
+"""
+
+
+@unittest.skipIf(gpu.cuda is None or gpu.np is None, "requires Numba and NumPy")
+class TestGPU(unittest.TestCase):
+    """Check the CUDA code on the CPU, without a device."""
+
+    # Either side of the word boundaries, up to the longest query the GPU takes.
+    queries = ["ab" * 31 + "a", "abc" * 21 + "a", "ba" * 32 + "c", "kitten" * 21 + "ab", "xyz" * 85 + "x"]
+    targets = ["", "QRS", "ab" * 40, "sitting" * 30 + "Q", "kitten" * 21 + "ab", "zyx" * 86]
+
+    def test_myers_blocks(self):
+        """Test the device function, compiled for the CPU, against the reference."""
+        myers_blocks = gpu.numba.njit(gpu._myers_blocks.py_func)
+        alphabet = dict()
+        for query in self.queries:
+            for char in query:
+                alphabet.setdefault(char, len(alphabet))
+        peq = gpu._pattern_masks(self.queries, alphabet)
+        for (q, query) in enumerate(self.queries):
+            words = (len(query) + 63) // 64
+            for target in self.targets:
+                ids = gpu.np.array([alphabet.get(c, len(alphabet)) for c in target], dtype=gpu.np.int32)
+                (vp, vn) = (gpu.np.zeros(gpu._WORDS, gpu.np.uint64), gpu.np.zeros(gpu._WORDS, gpu.np.uint64))
+                with self.subTest(lengths=(len(query), len(target))):
+                    result = myers_blocks(peq[q], words, (len(query) - 1) % 64, ids, vp, vn)
+                    self.assertEqual(_reference_distance(query, target, (0, 1, 1, 1, 0)), result)
+
+    def test_pairwise_kernel(self):
+        """Test pairwise_distance with the kernel run by Numba's CUDA simulator."""
+        env = dict(os.environ, NUMBA_ENABLE_CUDASIM="1")
+        env["PYTHONPATH"] = os.pathsep.join(
+            [os.path.dirname(os.path.dirname(gpu.__file__))] + sys.path
+        )
+        run = subprocess.run(
+            [sys.executable, "-c", _SIMULATED_PAIRWISE], env=env, capture_output=True, text=True
+        )
+        self.assertEqual(0, run.returncode, run.stderr)
+
 if __name__ == '__main__':
     unittest.main()
@@ -1,4 +1,15 @@
-from setuptools import find_packages, setup
+from setuptools import Extension, find_packages, setup
+
+# The compiled kernel is optional: without Cython, or if it fails to
+# build, the package falls back to its pure-Python implementation.
+try:
+    from Cython.Build import cythonize
+except ImportError:
+    ext_modules = []
+else:
+    ext_modules = cythonize(
+        [Extension('brew_distance._edit_path_c', ['brew_distance/_edit_path_c.pyx'], optional=True)]
+    )
 
 long_description = """\
 Brew-Distance implements a weighted edit distance algorithm. This provides
@@ -15,6 +26,7 @@ setup(
     author_email='dhgutteridge@hotmail.com',
     url='http://github.com/dhgutteridge/brew-distance',
     packages=find_packages(),
+    ext_modules=ext_modules,
     license='LICENSE.txt',
     description='A Python module that implements a weighted edit distance algorithm.',
     long_description=long_description,